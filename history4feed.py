@@ -1,27 +1,56 @@
 import argparse
 import sys
 import time
-from datetime import datetime, date, time as dt_time, timezone
-from io import BytesIO, StringIO
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from io import BytesIO, StringIO, TextIOWrapper
 from xml.dom.minidom import Document, Element, parse
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
 
 from pathlib import Path
-import sqlite3, os, uuid
+import sqlite3, os, uuid, tempfile
 import waybackpack, requests
 from dateutil.parser import parse as parse_date
 from readability import Document as ReadabilityDocument
 from tqdm.auto import tqdm
-import itertools, json, hashlib
+import itertools, json, hashlib, codecs, re, zlib
+import threading, bisect
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import brotli
+import charset_normalizer
 import logging
 from types import SimpleNamespace
-from typing import Any
+from collections import OrderedDict
+from typing import Any, BinaryIO
 from dotenv import load_dotenv
 
 
 LINK_TO_SELF = "https://github.com/signalscorps/history4feed"
 LOG_PRINT = 105
 DEFAULT_USER_AGENT = "History4Feed"
+SCRAPFLY_API = "https://api.scrapfly.io"
+PROXY_COUNTRIES = "us,ca,mx,gb,fr,de,au,at,be,hr,cz,dk,ee,fi,ie,se,es,pt,nl"
+DEFAULT_PROXY_CONCURRENCY = 1
+BLOCKED_STATUS_CODES = [401, 403, 407, 429, 503]
+DIRECT_HOSTS = ["web.archive.org"] # never needs the proxy
+FULL_TEXT_BATCH_SIZE = 20
+PROXY_CACHE_SIZE = 2 * 1024 * 1024 # characters
+PROXY_CACHE_ITEM_SIZE = 256 * 1024
+DEFAULT_MAX_BODY_SIZE = 50 * 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+BROTLI_SLICE_SIZE = 16
+SNIFF_SIZE = 1024
+CHARSET_SAMPLE_SIZE = 64 * 1024
+BLOB_CHUNK_SIZE = 64 * 1024
+XML_ENCODING_RE = re.compile(rb'^\s*<\?xml[^>]*encoding=["\']([\w.:-]+)["\']')
+CONTENT_TYPE_CHARSET_RE = re.compile(rb'charset=["\']?([\w.:-]+)', re.I)
+HTML_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+SITEMAP_PATHS = ["/sitemap.xml", "/sitemap_index.xml", "/wp-sitemap.xml"]
+SITEMAP_MAX_DEPTH = 3
+NON_POST_SEGMENTS = {"tag", "tags", "category", "categories", "page", "author"}
 
 class Session(object):
     def __init__(
@@ -29,12 +58,14 @@ class Session(object):
         follow_redirects=False,
         user_agent=DEFAULT_USER_AGENT,
         max_retries=3,
-        sleep_seconds=1
+        sleep_seconds=1,
+        max_body_size=DEFAULT_MAX_BODY_SIZE
     ):
         self.follow_redirects = follow_redirects
         self.user_agent = user_agent
         self.max_retries = max_retries
         self.sleep_seconds = sleep_seconds
+        self.max_body_size = max_body_size
 
     def get(self, url, **kwargs):
         headers = {
@@ -58,6 +89,7 @@ class Session(object):
                 logger.info("Waiting 1 second before retrying.")
                 retries += 1
                 if retries <= self.max_retries:
+                    res.close()
                     logger.info("Waiting 1 second before retrying.")
                     time.sleep(self.sleep_seconds)
                     continue
@@ -105,12 +137,23 @@ class NoneDict(dict):
         except:
             return None
 
+def canonicalize_link(link: str) -> str:
+    parts = urlsplit(link.strip())
+    netloc = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        netloc += f":{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit(("https", netloc, parts.path.rstrip("/"), urlencode(query), ""))
+
 class FeedEntry(dict):
     element: Element = None
     author = ''
     type = 'rss'
     _id = None
-    link = title = description = None
+    link = canonical_link = title = description = None
 
     def __init__(self, elem, link, blog_id=None):
         if not elem:
@@ -119,6 +162,7 @@ class FeedEntry(dict):
             elem = parse(StringIO(elem)).firstChild
         self.element = elem
         self.link = link
+        self.canonical_link = canonicalize_link(link)
         self.title = getText(getFirstElementByTag(elem, "title"))
         self.created = get_publish_date(elem)
         self.added = datetime.now(timezone.utc)
@@ -149,8 +193,8 @@ class FeedEntry(dict):
     @property
     def id(self):
         if not self._id:
-            # self._id = hashlib.sha512((self.link+str(self.blog_id)).encode()).hexdigest()
-            self._id = str(uuid.uuid4())
+            # derived from the canonical link so the same post always gets the same id
+            self._id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{self.blog_id}:{self.canonical_link}"))
         return self._id
 
     @property
@@ -181,6 +225,56 @@ class FeedEntry(dict):
         for k, v in dct.items():
             setattr(self, k, v)
 
+class EntryIndex(object):
+    """
+    Column-oriented view of feed entries ordered newest first.
+    Date windows are found by bisecting the timestamp column instead of checking every entry.
+    """
+    def __init__(self, entries: dict[str, FeedEntry]):
+        self.entries = entries
+        self.keys = sorted(entries, key=lambda key: -self.timestamp(entries[key].created))
+        # negated so the column is ascending while the keys stay newest first
+        self.negated_timestamps = array("d", (-self.timestamp(entries[key].created) for key in self.keys))
+        # dates are compared in each entry's own timezone, like `created.date()`
+        self.ordinals = array("l", (entries[key].created.date().toordinal() for key in self.keys))
+
+    @staticmethod
+    def timestamp(d: datetime) -> float:
+        if not d.tzinfo:
+            d = d.replace(tzinfo=timezone.utc)
+        return d.timestamp()
+
+    def count_since(self, d: date) -> int:
+        """Number of entries created at or after midnight UTC on `d`."""
+        start = datetime.combine(d, dt_time.min, timezone.utc)
+        return bisect.bisect_right(self.negated_timestamps, -start.timestamp())
+
+    def window(self, earliest_entry: date = None, latest_entry: date = None) -> list[str]:
+        """Keys of entries created between the two dates (inclusive), newest first."""
+        # utc offsets are at most 14 hours, so entries more than a day inside the bounds are
+        # in the window whatever their timezone, and only the edges need their date checked
+        n, day = len(self.keys), timedelta(days=1)
+        outer_lo = self.count_since(latest_entry + 2*day) if latest_entry else 0
+        inner_lo = self.count_since(latest_entry) if latest_entry else 0
+        inner_hi = self.count_since(earliest_entry + day) if earliest_entry else n
+        outer_hi = self.count_since(earliest_entry - day) if earliest_entry else n
+        first = earliest_entry.toordinal() if earliest_entry else 0
+        last = latest_entry.toordinal() if latest_entry else sys.maxsize
+        def checked(lo, hi):
+            return [key for key, ordinal in zip(self.keys[lo:hi], self.ordinals[lo:hi]) if first <= ordinal <= last]
+        if inner_lo >= inner_hi:
+            return checked(outer_lo, outer_hi)
+        return checked(outer_lo, inner_lo) + self.keys[inner_lo:inner_hi] + checked(inner_hi, outer_hi)
+
+    @staticmethod
+    def unknown(keys: list[str], *known) -> list[str]:
+        """Keys not in any of the `known` collections, in their original order."""
+        known_keys = set().union(*known)
+        return [key for key in keys if key not in known_keys]
+
+    def select(self, keys: list[str]) -> list[FeedEntry]:
+        return [self.entries[key] for key in keys]
+
 def createTextElement(document: Document, tagName, text):
     el = document.createElement(tagName)
     txtNode = document.createTextNode(text or "")
@@ -201,6 +295,33 @@ def createRSSHeader(feed_data):
     channel.appendChild(createTextElement(d, "generator", LINK_TO_SELF))
     return d, channel
 
+class FeedWriter(object):
+    """
+    Writes the RSS feed to `stream` one item at a time. The output is the same as
+    appending every item to `createRSSHeader` and calling `toxml()` (or `toprettyxml()`
+    if `pretty`), without holding the whole document in memory.
+    """
+    def __init__(self, stream, feed_data, pretty=False):
+        self.stream = stream
+        self.addindent, self.newl = ("\t", "\n") if pretty else ("", "")
+        self.feed_data = feed_data
+
+    def __enter__(self):
+        # an empty document only writes the xml declaration
+        Document().writexml(self.stream, "", self.addindent, self.newl)
+        self.stream.write(f'<rss version="2.0">{self.newl}{self.addindent}<channel>{self.newl}')
+        _, channel = createRSSHeader(self.feed_data)
+        for element in channel.childNodes:
+            element.writexml(self.stream, self.addindent*2, self.addindent, self.newl)
+        return self
+
+    def write_entry(self, entry: FeedEntry):
+        entry.build_entry_element().writexml(self.stream, self.addindent*2, self.addindent, self.newl)
+
+    def __exit__(self, *exc):
+        self.stream.write(f"{self.addindent}</channel>{self.newl}</rss>{self.newl}")
+        self.stream.flush()
+
 class DBHelper:
     DEFAULT_PATH = "history4feed.sqlite"
     def __init__(self, db_path: Path = None) -> None:
@@ -228,6 +349,7 @@ class DBHelper:
                     latest_entry TEXT,
                     ignore_live_feed_entries BOOLEAN,
                     pretty BOOLEAN,
+                    use_sitemap BOOLEAN,
                     UNIQUE (id)
                 )
             ''')
@@ -265,10 +387,50 @@ class DBHelper:
                 )
             ''')
 
+            # Create PostLink table, maps the canonical link of each post to its id
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS PostLink (
+                    blog_id TEXT,
+                    canonical_link TEXT,
+                    post_id TEXT,
+                    FOREIGN KEY(blog_id) REFERENCES Blog(id) ON DELETE CASCADE,
+                    PRIMARY KEY (blog_id, canonical_link)
+                )
+            ''')
+
             conn.commit()
             conn.close()
+        self.migrate_database()
 
-    def add_blog(self, blog, feed_id):
+    def migrate_database(self):
+        # bring databases created by older versions up to the current schema
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        feed_columns = [row[1] for row in cursor.execute("PRAGMA table_info(Feed)")]
+        if "use_sitemap" not in feed_columns:
+            cursor.execute("ALTER TABLE Feed ADD COLUMN use_sitemap BOOLEAN")
+        if not cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'PostLink'").fetchone():
+            cursor.execute('''
+                CREATE TABLE PostLink (
+                    blog_id TEXT,
+                    canonical_link TEXT,
+                    post_id TEXT,
+                    FOREIGN KEY(blog_id) REFERENCES Blog(id) ON DELETE CASCADE,
+                    PRIMARY KEY (blog_id, canonical_link)
+                )
+            ''')
+            posts = cursor.execute("SELECT blog_id, link, id FROM Post WHERE description IS NOT NULL").fetchall()
+            cursor.executemany('''
+                INSERT OR IGNORE INTO PostLink VALUES (?, ?, ?);
+            ''', [(blog_id, canonicalize_link(link), post_id) for blog_id, link, post_id in posts if link])
+        conn.commit()
+        conn.close()
+
+    def add_blog(self, blog, feed_id, full_rss: BinaryIO = None):
+        """
+        `full_rss`, if given, is a file holding the utf-8 encoded feed, positioned at its end.
+        It is stored as a blob in the same transaction as the rest of the blog.
+        """
         blog['id'] = blog['feed_id'] = feed_id
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -277,6 +439,18 @@ class DBHelper:
         cursor.execute(f'''
             INSERT OR REPLACE INTO Blog VALUES (:id, :title, :description, :url, :latest_post, :earliest_post, :full_rss);
         ''', NoneDict(blog))
+        if full_rss:
+            size = full_rss.tell()
+            full_rss.seek(0)
+            if hasattr(conn, "blobopen"): # python 3.11+
+                cursor.execute("UPDATE Blog SET full_rss = zeroblob(?) WHERE id = ?", (size, feed_id))
+                rowid, = cursor.execute("SELECT rowid FROM Blog WHERE id = ?", (feed_id,)).fetchone()
+                with conn.blobopen("Blog", "full_rss", rowid) as blob:
+                    while chunk := full_rss.read(BLOB_CHUNK_SIZE):
+                        blob.write(chunk)
+            else:
+                # not streamed, older pythons have no blob handles so the whole feed is read into memory once
+                cursor.execute("UPDATE Blog SET full_rss = ? WHERE id = ?", (full_rss.read(), feed_id))
         cursor.execute(f"""
             UPDATE Feed
                 SET last_run = ?
@@ -318,7 +492,7 @@ class DBHelper:
         feed_settings['last_run'] = now
         feed_settings['type']     = feed_type
         cursor.execute(f'''
-            INSERT INTO Feed VALUES (:id, :type, :url, :created, :last_run, :retries, :sleep_seconds, :earliest_entry, :latest_entry, :ignore_live_feed_entries, :pretty);
+            INSERT INTO Feed VALUES (:id, :type, :url, :created, :last_run, :retries, :sleep_seconds, :earliest_entry, :latest_entry, :ignore_live_feed_entries, :pretty, :use_sitemap);
         ''', NoneDict(feed_settings))
         conn.commit()
         conn.close()
@@ -333,6 +507,10 @@ class DBHelper:
         cursor.executemany(f'''
             INSERT OR REPLACE INTO Post VALUES (:id, :blog_id, :title, :link, :author, :created, :added, :categories, :description, :raw_xml);
         ''', posts)
+        # posts that failed to process into full text stay out of the index so they are retried
+        cursor.executemany(f'''
+            INSERT OR IGNORE INTO PostLink VALUES (:blog_id, :canonical_link, :id);
+        ''', [post for post in posts if post.description is not None])
         conn.commit()
         conn.close()
 
@@ -350,6 +528,33 @@ class DBHelper:
         conn.close()
         return resp
 
+    def get_link_index(self, blog_id) -> dict[str, str]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT canonical_link, post_id FROM PostLink WHERE blog_id = ?;
+        ''', (blog_id,))
+        resp = dict(cursor.fetchall())
+        conn.commit()
+        conn.close()
+        return resp
+
+    def get_descriptions(self, post_ids) -> dict[str, str]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        post_ids = list(post_ids)
+        resp = {}
+        # batched to stay under sqlite's bound parameter limit
+        for i in range(0, len(post_ids), 500):
+            batch = post_ids[i:i+500]
+            cursor.execute(f'''
+                SELECT id, description FROM Post WHERE description IS NOT NULL AND id IN ({", ".join("?" * len(batch))});
+            ''', batch)
+            resp.update(cursor.fetchall())
+        conn.commit()
+        conn.close()
+        return resp
+
     def get_feed_list(self):
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -388,6 +593,9 @@ class DBHelper:
         if resp:
             d, full_rss = resp
             d = d and parse_date(d)
+            # streamed feeds are stored as utf-8 blobs
+            if isinstance(full_rss, bytes):
+                full_rss = full_rss.decode()
         conn.commit()
         conn.close()
         return d, full_rss
@@ -435,31 +643,304 @@ def getFirstChildByTag(node: Element, tag):
 
 class FetchRedirect(History4FeedException):
     pass
+class FetchBlocked(History4FeedException):
+    pass
+class BodyTooLarge(History4FeedException):
+    pass
 
-def fetch_page(session, url) -> bytes:
-    proxy_apikey = os.getenv("SCRAPFILE_APIKEY")
-    
-    if proxy_apikey:
-        logger.info(f"Fetching `{url}` via scrapfile.io")
-        resp = session.get("https://api.scrapfly.io/scrape", params=dict(key=proxy_apikey, url=url, country="us,ca,mx,gb,fr,de,au,at,be,hr,cz,dk,ee,fi,ie,se,es,pt,nl"))
-        result = SimpleNamespace(**resp.json()['result'])
-        if result.status_code > 399:
-            raise History4FeedException(f"PROXY_GET Request failed for `{url}`, status: {result.status_code}, reason: {result.status}")
-        elif result.status_code > 299:
-            raise FetchRedirect(f"PROXY_GET for `{url}` redirected, status: {result.status_code}, reason: {result.status}")
-        return result.content.encode()
+class ZlibDecoder(object):
+    """Inflates gzip or deflate data without producing more than `max_length` bytes per call."""
+    def __init__(self, wbits=zlib.MAX_WBITS):
+        self._wbits = wbits
+        self._decompressor = zlib.decompressobj(wbits)
+        self._started = False
 
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        try:
+            out = self._decompressor.decompress(data, max_length)
+        except zlib.error:
+            # many servers send raw deflate without the zlib header, retry it the way urllib3 does
+            if self._started or self._wbits != zlib.MAX_WBITS:
+                raise
+            self._wbits = -zlib.MAX_WBITS
+            self._decompressor = zlib.decompressobj(self._wbits)
+            out = self._decompressor.decompress(data, max_length)
+        self._started = True
+        while self._decompressor.unconsumed_tail and len(out) < max_length:
+            out += self._decompressor.decompress(self._decompressor.unconsumed_tail, max_length - len(out))
+        return out
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush()
+
+    def finished(self) -> bool:
+        return self._decompressor.eof
+
+class BrotliDecoder(object):
+    """Decodes brotli data without producing (much) more than `max_length` bytes per call."""
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        if hasattr(self._decompressor, "can_accept_more_data"): # brotli >= 1.2
+            out = self._decompressor.process(data, output_buffer_limit=max_length)
+            while len(out) < max_length and not self._decompressor.can_accept_more_data():
+                out += self._decompressor.process(b"", output_buffer_limit=max_length - len(out))
+            return out
+        # older `brotli` (process) and `brotlipy` (decompress) can't cap their output, so feed
+        # them small slices to bound how far past `max_length` one call can go
+        decompress = getattr(self._decompressor, "process", None) or self._decompressor.decompress
+        out = bytearray()
+        for i in range(0, len(data), BROTLI_SLICE_SIZE):
+            out += decompress(data[i:i+BROTLI_SLICE_SIZE])
+            if len(out) >= max_length:
+                break
+        return bytes(out)
+
+    def flush(self) -> bytes:
+        return b""
+
+    def finished(self) -> bool:
+        if hasattr(self._decompressor, "is_finished"):
+            return self._decompressor.is_finished()
+        try: # brotlipy
+            self._decompressor.finish()
+            return True
+        except Exception:
+            return False
+
+def get_decoder(encoding: str):
+    encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return ZlibDecoder(16+zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return ZlibDecoder()
+    if encoding == "br":
+        return BrotliDecoder()
+    return None
+
+def sniff_decoder(head: bytes):
+    if head[:2] == b"\x1f\x8b":
+        return get_decoder("gzip")
+    if head.lstrip()[:1] in (b"<", b"{") or head.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return None
+    # wayback sometimes serves deflate or brotli without a Content-Encoding. Only zlib wrapped
+    # deflate has a header to recognise, and brotli has no magic bytes at all, so only trust an
+    # encoding that turns the first few bytes into something
+    candidates = ["br"]
+    if len(head) > 1 and head[0] == 0x78 and (head[0]*256 + head[1]) % 31 == 0:
+        candidates.insert(0, "deflate")
+    for encoding in candidates:
+        try:
+            if get_decoder(encoding).decompress(head, SNIFF_SIZE):
+                return get_decoder(encoding)
+        except Exception:
+            pass
+    return None
+
+def read_body(resp: requests.Response, max_size: int = None) -> bytes:
+    if max_size and int(resp.headers.get("Content-Length") or 0) > max_size:
+        raise BodyTooLarge(f"Response for `{resp.url}` is larger than {max_size} bytes")
+    chunks = resp.raw.stream(BODY_CHUNK_SIZE, decode_content=False)
+    head = next(chunks, b"")
+    encodings = [e for e in resp.headers.get("Content-Encoding", "").split(",") if e.strip() and e.strip().lower() != "identity"]
+    if encodings:
+        decoders = [get_decoder(e) for e in reversed(encodings)]
+        if None in decoders:
+            raise History4FeedException(f"Unsupported Content-Encoding `{resp.headers['Content-Encoding']}` for `{resp.url}`")
+    else:
+        decoders = [d for d in [sniff_decoder(head)] if d]
+
+    limit = max_size or sys.maxsize
+    # a sniffed encoding is only a guess, keep the raw bytes until the whole body has decoded
+    raw = bytearray() if decoders and not encodings else None
+    body = bytearray()
+    for chunk in itertools.chain([head], chunks, [None]):
+        last, chunk = chunk is None, chunk or b""
+        if raw is not None:
+            raw += chunk
+        try:
+            for decoder in decoders:
+                # never let a decoder produce more than one byte past the limit, so a small
+                # compressed body can't expand into gigabytes before we notice
+                chunk = decoder.decompress(chunk, limit - len(body) + 1)
+                if last:
+                    chunk += decoder.flush()
+                if len(body) + len(chunk) > limit:
+                    raise BodyTooLarge(f"Response for `{resp.url}` is larger than {max_size} bytes")
+            if last and raw is not None and not all(decoder.finished() for decoder in decoders):
+                raise History4FeedException("sniffed encoding did not decode the whole body")
+        except Exception as e:
+            if raw is None or isinstance(e, BodyTooLarge):
+                raise
+            logger.info(f"Response for `{resp.url}` is not {type(decoders[0]).__name__} encoded after all: {e}")
+            decoders, body, chunk, raw = [], raw, b"", None
+        body += chunk
+        if len(body) > limit:
+            raise BodyTooLarge(f"Response for `{resp.url}` is larger than {max_size} bytes")
+    return bytes(body)
+
+def detect_charset(body: bytes, content_type: str = "") -> str:
+    for bom, charset in [(codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]:
+        if body.startswith(bom):
+            return charset
+    head = body[:2048]
+    declared = XML_ENCODING_RE.search(head) or CONTENT_TYPE_CHARSET_RE.search(content_type.encode()) or HTML_CHARSET_RE.search(head)
+    if declared:
+        try:
+            return codecs.lookup(declared.group(1).decode("ascii")).name
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        head = body[:CHARSET_SAMPLE_SIZE]
+        head.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # a multi-byte character can be cut in half at the end of the sample
+        if e.start >= len(head) - 3 and len(body) > len(head):
+            return "utf-8"
+    guess = charset_normalizer.from_bytes(body[:CHARSET_SAMPLE_SIZE]).best()
+    return guess.encoding if guess else "utf-8"
+
+def fetch_page(session, url) -> str:
     logger.info(f"Fetching `{url}`")
     resp  = session.get(url)
-    if not resp.ok:
-        raise History4FeedException(f"GET Request failed for `{url}`, status: {resp.status_code}, reason: {resp.reason}")
-
-    # some times, wayback returns br encoding, try decompressing
     try:
-        return brotli.decompress(resp.content)
-    except:
-        pass
-    return resp.content
+        if resp.status_code in BLOCKED_STATUS_CODES:
+            raise FetchBlocked(f"GET Request blocked for `{url}`, status: {resp.status_code}, reason: {resp.reason}")
+        if not resp.ok:
+            raise History4FeedException(f"GET Request failed for `{url}`, status: {resp.status_code}, reason: {resp.reason}")
+        body = read_body(resp, session.max_body_size)
+    finally:
+        resp.close()
+    return body.decode(detect_charset(body, resp.headers.get("Content-Type", "")), errors="replace")
+
+def fetch_via_proxy(session, url, proxy_apikey) -> tuple[str, int]:
+    logger.info(f"Fetching `{url}` via scrapfile.io")
+    resp = session.get(SCRAPFLY_API+"/scrape", params=dict(key=proxy_apikey, url=url, country=PROXY_COUNTRIES))
+    data = resp.json()
+    cost = resp.headers.get("X-Scrapfly-Api-Cost") or ((data.get('context') or {}).get('cost') or {}).get('total') or 0
+    result = SimpleNamespace(**data['result'])
+    if result.status_code > 399:
+        raise History4FeedException(f"PROXY_GET Request failed for `{url}`, status: {result.status_code}, reason: {result.status}")
+    elif result.status_code > 299:
+        raise FetchRedirect(f"PROXY_GET for `{url}` redirected, status: {result.status_code}, reason: {result.status}")
+    if session.max_body_size and len(result.content) > session.max_body_size:
+        raise BodyTooLarge(f"Response for `{url}` is larger than {session.max_body_size} bytes")
+    return result.content, int(cost)
+
+def get_proxy_concurrency(session, proxy_apikey) -> int:
+    try:
+        resp = session.get(SCRAPFLY_API+"/account", params=dict(key=proxy_apikey))
+        subscription = resp.json()['subscription']
+        return int(subscription.get('max_concurrency') or subscription['usage']['scrape']['concurrent_limit'])
+    except BaseException as e:
+        logger.info(f"Unable to read proxy concurrency limit, using {DEFAULT_PROXY_CONCURRENCY}: {e}")
+        return DEFAULT_PROXY_CONCURRENCY
+
+class FetchRouter(object):
+    """
+    Decides per host whether pages are fetched directly or through the proxy.
+    Hosts start out direct and are moved to the proxy the first time they block us.
+    """
+    def __init__(self, session, proxy_apikey=None):
+        self.session = session
+        self.proxy_apikey = proxy_apikey
+        self.routes = dict.fromkeys(DIRECT_HOSTS, "direct")
+        # small LRU for pages fetched more than once (robots.txt, sitemaps), full text pages are only fetched once
+        self.cache: OrderedDict[str, str] = OrderedDict()
+        self.cache_size = 0
+        self.stats: dict[str, SimpleNamespace] = {}
+        self._concurrency = None
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency(self) -> int:
+        if self._concurrency is None:
+            self._concurrency = get_proxy_concurrency(self.session, self.proxy_apikey) if self.proxy_apikey else 1
+        return self._concurrency
+
+    def route(self, url):
+        return self.routes.get(urlsplit(url).netloc.lower())
+
+    def fetch(self, url) -> str:
+        host = urlsplit(url).netloc.lower()
+        if self.routes.get(host) != "proxy":
+            try:
+                content = self._measure(host, fetch_page, self.session, url)
+                self.routes.setdefault(host, "direct")
+                return content
+            except (FetchBlocked, requests.ConnectionError) as e:
+                if not self.proxy_apikey or host in DIRECT_HOSTS:
+                    raise
+                with self._lock:
+                    self.routes[host] = "proxy"
+                logger.print(f"Direct requests to `{host}` are blocked, switching to proxy")
+            except History4FeedException:
+                self.routes.setdefault(host, "direct")
+                raise
+        with self._lock:
+            if url in self.cache:
+                self.cache.move_to_end(url)
+                return self.cache[url]
+        content, cost = self._measure(host, fetch_via_proxy, self.session, url, self.proxy_apikey, proxied=True)
+        with self._lock:
+            self.stats[host].credits += cost
+            if len(content) <= PROXY_CACHE_ITEM_SIZE and url not in self.cache:
+                self.cache[url] = content
+                self.cache_size += len(content)
+                while self.cache_size > PROXY_CACHE_SIZE:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cache_size -= len(evicted)
+        return content
+
+    def fetch_many(self, urls: list[str], sleep_seconds: float = 0) -> dict[str, str | BaseException]:
+        """
+        Fetch `urls`, running proxied requests concurrently while direct ones are fetched
+        one after another with `sleep_seconds` between them.
+        Failed fetches are returned as the exception raised.
+        """
+        results = {}
+        def fetch(url):
+            try:
+                return self.fetch(url)
+            except BaseException as e:
+                return e
+
+        # the first request to an unknown host decides its route
+        for url in urls:
+            if url not in results and self.route(url) is None:
+                results[url] = fetch(url)
+                time.sleep(sleep_seconds)
+
+        proxied = [url for url in dict.fromkeys(urls) if url not in results and self.route(url) == "proxy"]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(proxied))) if proxied else 1) as pool:
+            futures = {url: pool.submit(fetch, url) for url in proxied}
+            for url in urls:
+                if url not in results and url not in futures:
+                    results[url] = fetch(url)
+                    time.sleep(sleep_seconds)
+            for url, future in futures.items():
+                results[url] = future.result()
+        return results
+
+    def report(self):
+        for host, stats in self.stats.items():
+            logger.print(
+                f"{host}: {stats.requests} requests ({stats.proxied} via proxy), {stats.credits} proxy credits, "
+                f"{stats.seconds/stats.requests:.2f}s average latency"
+            )
+
+    def _measure(self, host, fetch, *args, proxied=False):
+        start = time.monotonic()
+        try:
+            return fetch(*args)
+        finally:
+            with self._lock:
+                stats = self.stats.setdefault(host, SimpleNamespace(requests=0, proxied=0, credits=0, seconds=0.0))
+                stats.requests += 1
+                stats.proxied += proxied
+                stats.seconds += time.monotonic() - start
 
 def get_publish_date(item):
     published = getFirstElementByTag(item, "published")
@@ -492,32 +973,127 @@ def get_namespaces(node):
     return namespaces
 
 def get_entries(document: Document, feed_type: str, blog_id) -> dict[str, FeedEntry]:
-    entries = {}
+    entries = {} # keyed by canonical link so variants of the same post collapse into one entry
     if feed_type == "atom":
         for item in document.getElementsByTagName("entry"):
-            link = getAtomLink(item, rel='alternate')
+            link = getText(getFirstElementByTag(item, "feedburner:origLink")).strip() or getAtomLink(item, rel='alternate')
 
-            entries[link] = FeedEntry(item, link, blog_id=blog_id)
+            entry = FeedEntry(item, link, blog_id=blog_id)
+            entries[entry.canonical_link] = entry
     elif feed_type == "rss":
         channel = getFirstElementByTag(document, "channel")
         for item in channel.getElementsByTagName("item"):
-            link = getText(getFirstElementByTag(item, "link")).strip()
+            link = getText(getFirstElementByTag(item, "feedburner:origLink")).strip() or getText(getFirstElementByTag(item, "link")).strip()
 
-            entries[link] = FeedEntry(item, link, blog_id=blog_id)
+            entry = FeedEntry(item, link, blog_id=blog_id)
+            entries[entry.canonical_link] = entry
     return entries
 
+def find_sitemaps(router: FetchRouter, site_url) -> list[str]:
+    parts = urlsplit(site_url)
+    root = f"{parts.scheme}://{parts.netloc}"
+    sitemaps = []
+    try:
+        robots = router.fetch(urljoin(root, "/robots.txt"))
+        for line in robots.splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(value.strip())
+    except History4FeedException:
+        logger.info(f"No robots.txt found for `{root}`")
+    if not sitemaps:
+        sitemaps = [urljoin(root, path) for path in SITEMAP_PATHS]
+    return sitemaps
+
+def iter_sitemap(content: str):
+    stream = StringIO(content)
+    for _, elem in ET.iterparse(stream):
+        if elem.tag not in (SITEMAP_NS+"sitemap", SITEMAP_NS+"url"):
+            continue
+        loc = (elem.findtext(SITEMAP_NS+"loc") or "").strip()
+        lastmod = (elem.findtext(SITEMAP_NS+"lastmod") or "").strip()
+        if lastmod:
+            lastmod = parse_date(lastmod)
+            if not lastmod.tzinfo:
+                lastmod = lastmod.replace(tzinfo=timezone.utc)
+        yield elem.tag[len(SITEMAP_NS):], loc, lastmod or None
+        elem.clear()
+
+def build_sitemap_entry(link, lastmod: datetime, blog_id=None) -> FeedEntry:
+    d = Document()
+    item = d.createElement('item')
+    item.appendChild(createTextElement(d, "title", ""))
+    item.appendChild(createTextElement(d, "link", link))
+    item.appendChild(createTextElement(d, "pubDate", lastmod.isoformat()))
+    item.appendChild(createTextElement(d, "description", ""))
+    return FeedEntry(item, link, blog_id=blog_id)
+
+def is_post_link(link: str) -> bool:
+    """False for links that are obviously not posts: the home page and tag, category, archive and author listings."""
+    segments = urlsplit(link).path.lower().strip("/").split("/")
+    return bool(segments[0]) and not NON_POST_SEGMENTS.intersection(segments)
+
+def get_sitemap_entries(router: FetchRouter, site_url, blog_id, earliest_entry: date = None, latest_entry: date = None) -> tuple[dict[str, FeedEntry], datetime, bool]:
+    """
+    Returns the sitemap entries between `earliest_entry` and `latest_entry`, the newest lastmod seen
+    and whether any post was skipped for being modified after `latest_entry`.
+    """
+    entries = {}
+    pending = [(sitemap, 0) for sitemap in find_sitemaps(router, site_url)]
+    visited = set()
+    undated = 0
+    newest, modified_later = None, False
+    while pending:
+        sitemap_url, depth = pending.pop(0)
+        if sitemap_url in visited or depth > SITEMAP_MAX_DEPTH:
+            continue
+        visited.add(sitemap_url)
+        try:
+            content = router.fetch(sitemap_url)
+            children = []
+            for kind, loc, lastmod in iter_sitemap(content):
+                if not loc:
+                    continue
+                if kind == "sitemap":
+                    # a sitemap's lastmod is the newest change in it, so older ones hold nothing we want
+                    if lastmod and earliest_entry and lastmod.date() < earliest_entry:
+                        continue
+                    children.append(loc)
+                    continue
+                if not lastmod:
+                    undated += 1
+                    continue
+                if not is_post_link(loc):
+                    continue
+                newest = max(newest or lastmod, lastmod)
+                if latest_entry and lastmod.date() > latest_entry:
+                    modified_later = True
+                elif not (earliest_entry and lastmod.date() < earliest_entry):
+                    entry = build_sitemap_entry(loc, lastmod, blog_id=blog_id)
+                    entries[entry.canonical_link] = entry
+            # prefer post sitemaps over pages, tags and categories when the index separates them
+            post_sitemaps = [child for child in children if "post" in urlsplit(child).path.lower()]
+            pending.extend((child, depth+1) for child in post_sitemaps or children)
+        except BaseException as e:
+            logger.info(f"failed to retrieve sitemap `{sitemap_url}`: {e}")
+    if undated:
+        logger.info(f"Skipped {undated} sitemap links without lastmod for `{site_url}`")
+    return entries, newest, modified_later
+
 def retrieve_feed(url, from_date, to_date, args=None, db: DBHelper=None, is_update=False):
     session = Session(
         user_agent="curl",
         follow_redirects=True,
         max_retries=3,
+        max_body_size=int(os.getenv("MAX_BODY_SIZE") or DEFAULT_MAX_BODY_SIZE),
     )
+    router = FetchRouter(session, os.getenv("SCRAPFILE_APIKEY"))
 
     feed_type: str = None
     entries = {} #put items in dict using url as key to eliminate duplicates
     # do initial feed validation
     try:
-        content = fetch_page(session, url)
+        content = router.fetch(url)
         live_doc, feed_metadata, feed_type = parse_xml(content, url)
         namespaces = get_namespaces(live_doc.firstChild)
     except History4FeedException:
@@ -534,8 +1110,6 @@ def retrieve_feed(url, from_date, to_date, args=None, db: DBHelper=None, is_upda
     feed_id = feed_setting['id']
     
     
-    new_posts = {}
-
     session.max_retries = int(feed_setting['retries'] or 0)
     db_doc = None
     if not newlycreated:
@@ -551,19 +1125,43 @@ def retrieve_feed(url, from_date, to_date, args=None, db: DBHelper=None, is_upda
         to_date   = datetime.now(timezone.utc).strftime('%Y%m%d')
         latest_post, earliest_post, full_rss = args.latest_post, args.earliest_post, args.full_rss
 
-    results = waybackpack.search(url, from_date=from_date, to_date=to_date, uniques_only=True, session=session)
-    timestamps = [
-            entry['timestamp'] for entry in results 
-                    # if int(entry['statuscode'])<300 #skip redirects
-        ]
+    filter_date1 = datetime.strptime(from_date, "%Y%m%d").date()
+    filter_date2 = datetime.strptime(to_date, "%Y%m%d").date()
+    live_entries = get_entries(live_doc, feed_type, feed_id)
+    wayback_ranges = [(from_date, to_date)]
+    if feed_setting.get('use_sitemap'):
+        # sitemap links go in first so archived and live versions of the same post take precedence
+        sitemap_entries, newest, modified_later = get_sitemap_entries(
+            router, feed_metadata['url'] or url, feed_id, earliest_entry=filter_date1, latest_entry=filter_date2,
+        )
+        entries.update(sitemap_entries)
+        logger.print(f"Found {len(sitemap_entries)} posts in sitemaps for `{url}`")
+        # posts modified after latest_entry could have been published any time, so wayback
+        # is still needed for the whole range. Otherwise only the periods before the oldest
+        # and after the newest sitemap date are not covered.
+        if entries and not modified_later:
+            wayback_ranges = [(from_date, min(to_date, min(entry.created for entry in entries.values()).strftime('%Y%m%d')))]
+            if newest.date() < filter_date2:
+                wayback_ranges.append((newest.strftime('%Y%m%d'), to_date))
+
+    timestamps = []
+    for wayback_from_date, wayback_to_date in wayback_ranges:
+        if wayback_to_date < wayback_from_date:
+            continue
+        results = waybackpack.search(url, from_date=wayback_from_date, to_date=wayback_to_date, uniques_only=True, session=session)
+        timestamps += [
+                entry['timestamp'] for entry in results 
+                        # if int(entry['statuscode'])<300 #skip redirects
+            ]
     document = None
     
     if timestamps:
+        timestamps = sorted(set(timestamps))
         pack = waybackpack.Pack(url, timestamps, uniques_only=True, session=session)
         for i, asset in tqdm(enumerate(pack.assets), "Retrieving archived feeds", len(pack.assets), unit='feed', colour='green'):
             url = asset.get_archive_url("id_")
             try:
-                content = fetch_page(session, url)
+                content = router.fetch(url)
                 document, _, feed_type = parse_xml(content, asset.timestamp)
                 namespaces.update(get_namespaces(document.firstChild))
                 entries.update(get_entries(document, feed_type, feed_id))
@@ -575,9 +1173,6 @@ def retrieve_feed(url, from_date, to_date, args=None, db: DBHelper=None, is_upda
         raise Exception("No Wayback Machine archive exists for this blog. Please use live feed.")
 
 
-    live_entries = get_entries(live_doc, feed_type, feed_id)
-    filter_date1 = datetime.strptime(from_date, "%Y%m%d").date()
-    filter_date2 = datetime.strptime(to_date, "%Y%m%d").date()
     # entries.update(live_entries)
     if feed_setting['ignore_live_feed_entries']:
         for link in live_entries.keys():
@@ -590,38 +1185,44 @@ def retrieve_feed(url, from_date, to_date, args=None, db: DBHelper=None, is_upda
         db_entries = get_entries(db_doc, "rss", feed_id)
         entries.update(db_entries)
 
-    for k, v in entries.items():
-        if db_entries.get(k) is None:
-            new_posts[k] = v
-
-    new_posts = filter_posts_by_dates(new_posts.values(), latest_entry=filter_date2, earliest_entry=filter_date1)
-
-    if new_posts:
-        process_into_full_text(session, new_posts, feed_type, feed_setting['sleep_seconds'])
-        logger.print(f"Processed {len(new_posts)} posts into full text")
+    index = EntryIndex(entries)
+    window = index.window(earliest_entry=filter_date1, latest_entry=filter_date2)
+    link_index = db.get_link_index(feed_id)
+    new_posts = index.select(index.unknown(window, db_entries.keys(), link_index.keys()))
 
-
-        filtered_entries = filter_posts_by_dates(entries.values(), latest_entry=filter_date2, earliest_entry=filter_date1)
-        #generate feed        
-        filtered_entries = sorted(filtered_entries, key=lambda x: x.created, reverse=True)
-        earliest_post, latest_post = filtered_entries[-1].created, filtered_entries[0].created
-        out, channel = createRSSHeader(feed_metadata)
-        for feed_entry in filtered_entries:
-            channel.appendChild(feed_entry.build_entry_element())
-
-        if feed_setting['pretty']:
-            full_rss = out.toprettyxml()
+    full_rss = None
+    try:
+        if new_posts:
+            process_into_full_text(router, new_posts, feed_type, feed_setting['sleep_seconds'])
+            logger.print(f"Processed {len(new_posts)} posts into full text")
+
+
+            #generate feed        
+            known_ids = {key: link_index[key] for key in window if key in link_index}
+            descriptions = db.get_descriptions(known_ids.values())
+            for key, post_id in known_ids.items():
+                if post_id in descriptions:
+                    entries[key].description_decoded = descriptions[post_id]
+            # known posts without a stored full text are left out rather than written empty
+            filtered_entries = [entry for entry in index.select(window) if entry.description is not None or entry.canonical_link not in known_ids]
+            earliest_post, latest_post = filtered_entries[-1].created, filtered_entries[0].created
+            full_rss = TextIOWrapper(tempfile.TemporaryFile(), encoding="utf-8", newline="")
+            with FeedWriter(full_rss, feed_metadata, pretty=feed_setting['pretty']) as writer:
+                for feed_entry in filtered_entries:
+                    writer.write_entry(feed_entry)
         else:
-            full_rss = out.toxml()
-    else:
-        earliest_post, latest_post, full_rss = None, None, None
-        logger.print(f"No new posts for `{url}`")
-
-    feed_metadata.update(earliest_post=earliest_post, latest_post=latest_post, full_rss=full_rss)
-    if newlycreated:
-        feed_id = db.add_feed(feed_setting, feed_type.upper())
-    db.add_blog(feed_metadata, feed_id)
+            earliest_post, latest_post = None, None
+            logger.print(f"No new posts for `{url}`")
+
+        feed_metadata.update(earliest_post=earliest_post, latest_post=latest_post, full_rss=None)
+        if newlycreated:
+            feed_id = db.add_feed(feed_setting, feed_type.upper())
+        db.add_blog(feed_metadata, feed_id, full_rss=full_rss and full_rss.buffer)
+    finally:
+        if full_rss:
+            full_rss.close()
     db.add_posts(new_posts)
+    router.report()
 
 def getAtomLink(node: Element, rel='self'):
     links = [child for child in node.childNodes if child.nodeType == child.ELEMENT_NODE and child.tagName in ['link', 'atom:link']]
@@ -633,29 +1234,47 @@ def getAtomLink(node: Element, rel='self'):
             break
     return link.attributes['href'].value
 
-def process_into_full_text(session, entries: dict[str, FeedEntry], feed_type: str, sleep_seconds: float) -> Document:
+def process_into_full_text(router: FetchRouter, entries: list[FeedEntry], feed_type: str, sleep_seconds: float) -> Document:
     is_atom = feed_type == "atom"
     d = Document()
-    for i, entry in tqdm(enumerate(entries), "Processing into full text", len(entries), unit='entry', colour='green'):
-        try:
-            fulltext = get_full_text(session, entry.link)
-            element: Element = entry.element
-            textnode = d.createCDATASection(fulltext)
-
-            if is_atom:
-                content = getFirstElementByTag(element, "content")
-            else:
-                content = getFirstElementByTag(element, "description")
-            content = content or SimpleNamespace(tagName="description")
-            newcontent: Element = d.createElement(content.tagName)
-            newcontent.appendChild(textnode)
-            newcontent.setAttribute("type", "html")
-            element.replaceChild(newcontent, content)
-            entry.description_decoded = fulltext
-            time.sleep(sleep_seconds)
-        except BaseException as e:
-            logger.print(f"failed to process `{entry.link}` into fulltext")
-            logger.error("", exc_info=True)
+    progress = tqdm(total=len(entries), desc="Processing into full text", unit='entry', colour='green')
+    for start in range(0, len(entries), FULL_TEXT_BATCH_SIZE):
+        batch = entries[start:start+FULL_TEXT_BATCH_SIZE]
+        pages = router.fetch_many([entry.link for entry in batch], sleep_seconds)
+        for entry in batch:
+            progress.update()
+            try:
+                page = pages[entry.link]
+                if isinstance(page, BaseException):
+                    raise page
+                fulltext, title = get_full_text(page, entry.link)
+                element: Element = entry.element
+                textnode = d.createCDATASection(fulltext)
+                if not entry.title:
+                    # entries discovered through sitemaps only have a link and a date
+                    entry.title = title
+                    newtitle = createTextElement(d, "title", title)
+                    if oldtitle := getFirstElementByTag(element, "title"):
+                        element.replaceChild(newtitle, oldtitle)
+                    else:
+                        element.appendChild(newtitle)
+
+                content = None
+                if is_atom:
+                    content = getFirstElementByTag(element, "content")
+                content = content or getFirstElementByTag(element, "description")
+                newcontent: Element = d.createElement(content.tagName if content else "description")
+                newcontent.appendChild(textnode)
+                newcontent.setAttribute("type", "html")
+                if content:
+                    element.replaceChild(newcontent, content)
+                else:
+                    element.appendChild(newcontent)
+                entry.description_decoded = fulltext
+            except BaseException as e:
+                logger.print(f"failed to process `{entry.link}` into fulltext")
+                logger.error("", exc_info=True)
+    progress.close()
     return entries
 
 def parse_xml(data, timestamp) -> tuple[Document, str]:
@@ -686,23 +1305,13 @@ def parse_xml(data, timestamp) -> tuple[Document, str]:
     except BaseException as e:
         raise UnknownFeedtypeException(f"Failed to parse feed from `{timestamp}`") from e
 
-def get_full_text(session, link):
+def get_full_text(page, link):
     try:
-        page = fetch_page(session, link)
         doc  = ReadabilityDocument(page, url=link)
-        return doc.summary()
+        return doc.summary(), doc.short_title()
     except BaseException as e:
         raise History4FeedException(f"Error processing fulltext: {e}") from e
 
-def filter_posts_by_dates(entries: list[FeedEntry], earliest_entry=None, latest_entry=None) -> list[FeedEntry]:
-    filtered_entries : list[FeedEntry] = []
-    # filter entries by --latest_entry
-    for feed_entry in entries:
-        if (latest_entry and feed_entry.created.date() > latest_entry) or (earliest_entry and feed_entry.created.date() < earliest_entry):
-            continue
-        filtered_entries.append(feed_entry)
-    return filtered_entries
-
 def parse_date_arg(date: str, name="date") -> str:
     if not date:
         return None
@@ -767,6 +1376,7 @@ def parse_arguments():
         parser.add_argument("--sleep_seconds", type=float, default=2, help="(optional): default is 0. This is useful when --full_text is used for a large amount of posts are returned. This sets the time between each request to get the full text of the article to reduce servers blocking robotic requests.")
         parser.add_argument("--latest_entry", help="(optional): Default is script run time. The latest record you want to scrap in format YYYY-MM-DD")
         parser.add_argument("--ignore_live_feed_entries", action="store_true", help="ignore any entries in the live feed URL entered")
+        parser.add_argument("--use_sitemap", action="store_true", help="(optional): default is false. If passed, post history is discovered from the blog's sitemaps first and the Wayback Machine is only used for the period the sitemaps do not cover.")
         parser.add_argument("--full_text_decoded", action="store_true", help=" (optional): default is false. If passed, full text is wrapped in a CDATA section.")
         args = parser.parse_args()
     else: